@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import logging
 import math
 from os import listdir
@@ -24,18 +26,34 @@ def get_filenames(directory, suffix):
     return (f for f in listdir(directory) if f.endswith('.' + suffix))
 
 
-def generate_content(directory, filenames):
+def load_nonempty_lines(filename):
+    '''
+    Load the non-empty lines (with surrounding whitespace stripped) from
+    a file.
+    '''
+    with open(filename) as f:
+        return [line for line in map(str.strip, f) if line]
+
+
+def generate_content(directory, filenames, workers=1):
     '''
     Generate tuples of file basename and file content string for given
     filenames and directory.
+
+    If `workers` > 1, the files are read in parallel by a pool of
+    threads (which overlaps the I/O latencies).
     '''
 
-    for filename in filenames:
-        with open(os.path.join(directory, filename)) as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    yield (filename.split('.')[0], line)
+    filenames = list(filenames)
+    paths = [os.path.join(directory, filename) for filename in filenames]
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            contents = list(executor.map(load_nonempty_lines, paths))
+    else:
+        contents = map(load_nonempty_lines, paths)
+    for filename, lines in zip(filenames, contents):
+        for line in lines:
+            yield (filename.split('.')[0], line)
 
 
 def load_pairs_from_file(filename):
@@ -55,14 +73,55 @@ def load_pairs_from_file(filename):
     return results
 
 
-def load_pairs_from_dir(directory, suffix):
+def load_pairs_from_dir(directory, suffix, workers=1):
     '''
     Load pairs of (line_ID, line) from a file. Each text file ending
     with `suffix` contains a line of text and the line ID is the file
     name without the suffix.
+
+    If `workers` > 1, the files are read by as many parallel threads.
     '''
     filenames = get_filenames(directory, suffix)
-    return list(generate_content(directory, filenames))
+    return list(generate_content(directory, filenames, workers))
+
+
+def generate_line_tuples_from_dir(directory, suffixes, workers=1,
+                                  batch_size=1000):
+    '''
+    Generate tuples (line_ID, line_1, ..., line_n) from files following
+    the scheme <directory>/<file_id>.<suffix_k> for the given `suffixes`.
+    The file IDs are taken from the files ending with the first suffix
+    (up to the first dot, as in `load_pairs_from_dir`). Each file is
+    expected to contain one line of text (of several lines, the last
+    non-empty one is taken; an empty file yields an empty line). IDs
+    with an empty first line, or with any of the files missing, are
+    skipped.
+
+    The files are read lazily in batches of `batch_size` IDs (by
+    `workers` parallel threads), so that only a single batch needs to be
+    kept in memory.
+    '''
+    def _load_lines(file_id):
+        result = []
+        for suffix in suffixes:
+            filename = os.path.join(directory, file_id + '.' + suffix)
+            if not os.path.exists(filename):
+                logging.warning('{} -- file not found'.format(filename))
+                return None
+            lines = load_nonempty_lines(filename)
+            result.append(lines[-1] if lines else '')
+        return tuple(result)
+
+    file_ids = (f[:-len(suffixes[0])-1] \
+                for f in get_filenames(directory, suffixes[0]))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(file_ids, batch_size))
+            if not batch:
+                break
+            for file_id, lines in zip(batch, executor.map(_load_lines, batch)):
+                if lines is not None and lines[0]:
+                    yield (file_id.split('.')[0],) + lines
 
 
 def load_lines_from_file(filename):
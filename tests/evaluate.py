@@ -0,0 +1,49 @@
+from ocrd_cor_asv_fst.scripts.evaluate import \
+    get_adjusted_distance, normalize_line
+
+import unittest
+
+
+class EvaluateTest(unittest.TestCase):
+
+    def test_adjusted_distance_umlaut_variants(self):
+        # an umlaut vs. base letter with combining e is a single error,
+        # regardless of the direction and the rest of the line
+        testdata = [
+            ('Bäume', 'Baͤume', 1.0),
+            ('Die Bäume blühen', 'Die Baͤume bluͤhen', 2.0),
+            ('uü', 'uuͤ', 1.0),
+            ('für', 'fuͤr', 1.0),
+            ('schön', 'schoͤn', 1.0) ]
+        for l1, l2, dist in testdata:
+            self.assertEqual(get_adjusted_distance(l1, l2), (dist, len(l2)))
+            self.assertEqual(get_adjusted_distance(l2, l1), (dist, len(l1)))
+
+    def test_adjusted_distance_baseline(self):
+        # results of the original (difflib-based) implementation, which
+        # the transition table in get_adjusted_distance reproduces
+        testdata = [
+            ('Koͤnig', 'König', 1.0),
+            ('Koͤnig', 'Konig', 1.0),
+            ('König', 'Konig', 1.0),
+            ('Maͤnner', 'Manner', 1.0),
+            ('fuͤr', 'fur', 1.0),
+            ('Hoͤhe', 'Hohe', 1.0),
+            ('Hoͤhe', 'Hähe', 2.0),
+            ('Müller', 'Muͤler', 2.0),
+            ('Übel', 'Uebel', 2.0),
+            ('daß er', 'daſs er', 2.0),
+            ('Gruͤße', 'Grüsse', 3.0),
+            ('x', 'aͤ', 2.0),
+            ('x', 'ä', 1.0),
+            ('', 'ä', 1.0) ]
+        for l1, l2, dist in testdata:
+            self.assertEqual(get_adjusted_distance(l1, l2), (dist, len(l2)))
+            self.assertEqual(get_adjusted_distance(l2, l1), (dist, len(l1)))
+
+    def test_normalize_line_keeps_long_s(self):
+        self.assertEqual(normalize_line('ſ', 'nfkc'), 'ſ')
+        self.assertEqual(normalize_line('ẛ', 'nfkc'), 'ẛ')
+        self.assertEqual(normalize_line('ﬅ', 'nfkc'), 'ſt')
+        self.assertEqual(normalize_line('ﬁ ﬆ', 'nfkc'), 'fi st')
+        self.assertEqual(normalize_line('ﬅ', 'nfc'), 'ﬅ')
@@ -1,6 +1,9 @@
-from ocrd_cor_asv_fst.lib.helper import transducer_from_dict
+from ocrd_cor_asv_fst.lib.helper import \
+    generate_line_tuples_from_dir, transducer_from_dict
 
+import os.path
 import pynini
+import tempfile
 import unittest
 
 
@@ -16,3 +19,34 @@ class HelperTest(unittest.TestCase):
             self.assertAlmostEqual(
                 testdata_in[key], testdata_out[key], places=5)
 
+    def _write_files(self, directory, files):
+        for filename, content in files.items():
+            with open(os.path.join(directory, filename), 'w') as fp:
+                fp.write(content)
+
+    def test_generate_line_tuples_from_dir(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self._write_files(directory, {
+                # several lines: the last non-empty one counts
+                'l1.gt.txt' : 'first\nlast\n\n',
+                'l1.ocr.txt' : 'lasst\n',
+                # empty OCR file: empty line
+                'l2.gt.txt' : 'abc\n',
+                'l2.ocr.txt' : '',
+                # missing OCR file: skipped
+                'l3.gt.txt' : 'def\n',
+                # empty GT file: skipped
+                'l4.gt.txt' : '\n',
+                'l4.ocr.txt' : 'ghi\n',
+                # dotted ID: shortened to the first part
+                'l5.x.gt.txt' : 'jkl\n',
+                'l5.x.ocr.txt' : 'jk1\n' })
+            with self.assertLogs(level='WARNING') as log:
+                result = sorted(generate_line_tuples_from_dir(
+                    directory, ('gt.txt', 'ocr.txt'), workers=2, batch_size=2))
+            self.assertEqual(result, [
+                ('l1', 'last', 'lasst'),
+                ('l2', 'abc', ''),
+                ('l5', 'jkl', 'jk1') ])
+            self.assertEqual(len(log.output), 1)
+            self.assertIn('l3.ocr.txt', log.output[0])